@@ -19,6 +19,7 @@ celery.conf.update({
     # Add imports configuration to ensure task discovery
     'imports': (
         'app.core.processor',
+        'app.core.autoscaler',
     ),
     # Add task routes if needed
     'task_routes': {
@@ -80,8 +81,10 @@ def create_app():
     # Register blueprints
     from app.routes.api import bp as api_bp
     from app.routes.monitor import bp as monitor_bp
+    from app.routes.uploads import bp as uploads_bp
     
     app.register_blueprint(api_bp, url_prefix='/api')
+    app.register_blueprint(uploads_bp, url_prefix='/api/uploads')
     app.register_blueprint(monitor_bp, url_prefix='/queue')
 
     @app.route('/health')
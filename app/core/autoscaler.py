@@ -0,0 +1,430 @@
+from pathlib import Path
+from dataclasses import dataclass
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Any, Callable, Set
+from celery.signals import worker_ready, worker_shutdown
+
+from app import celery
+from app.utils.redis_utils import RedisManager
+from app.core.encoding import DEFAULT_WORK_UNITS
+
+logger = logging.getLogger(__name__)
+
+
+def get_host_limits() -> Dict[str, float]:
+    """Get the CPU and memory available to this process, honouring cgroup limits"""
+    cpus = float(os.cpu_count() or 1)
+    try:
+        quota, period = Path('/sys/fs/cgroup/cpu.max').read_text().split()
+        if quota != 'max':
+            cpus = min(cpus, int(quota) / int(period))
+    except (OSError, ValueError):
+        pass
+
+    memory_mb = None
+    try:
+        for line in Path('/proc/meminfo').read_text().splitlines():
+            if line.startswith('MemTotal:'):
+                memory_mb = int(line.split()[1]) // 1024
+                break
+    except (OSError, ValueError):
+        pass
+
+    for limit_path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            value = Path(limit_path).read_text().strip()
+            if value != 'max':
+                limit_mb = int(value) // (1024 * 1024)
+                memory_mb = min(memory_mb, limit_mb) if memory_mb else limit_mb
+            break
+        except (OSError, ValueError):
+            continue
+
+    limits = {'cpus': cpus}
+    if memory_mb:
+        limits['memory_mb'] = memory_mb
+    return limits
+
+
+# Stops the limits refresh thread when the worker shuts down
+_limits_stopped = threading.Event()
+
+
+@worker_ready.connect
+def publish_worker_limits(sender=None, **kwargs):
+    """
+    Publish the worker's resource limits so the autoscaler can respect them.
+    The limits expire, so they are refreshed for as long as the worker runs.
+    """
+    hostname = sender.hostname
+    limits = get_host_limits()
+    redis_manager = RedisManager()
+    redis_manager.set_worker_limits(hostname, limits)
+    logger.info(f"Published worker limits for {hostname}: {limits}")
+
+    def refresh():
+        while not _limits_stopped.wait(redis_manager.worker_limits_expiry / 3):
+            try:
+                redis_manager.set_worker_limits(hostname, limits)
+            except Exception as e:
+                logger.warning(f"Unable to refresh worker limits for {hostname}: {str(e)}")
+
+    threading.Thread(target=refresh, name='worker-limits', daemon=True).start()
+
+
+@worker_shutdown.connect
+def remove_worker_limits(sender=None, **kwargs):
+    """Remove the worker's resource limits so a stopped worker is not counted"""
+    _limits_stopped.set()
+    hostname = getattr(sender, 'hostname', None)
+    if hostname:
+        RedisManager().delete_worker_limits(hostname)
+
+
+@dataclass
+class AutoscalerConfig:
+    """Autoscaler settings; worker counts are pool processes per worker node"""
+    min_workers: int = 1
+    max_workers: int = 8
+    target_units_per_worker: float = 600.0
+    cpus_per_worker: float = 1.0
+    memory_per_worker_mb: int = 1024
+    scale_up_after: int = 2
+    scale_down_after: int = 6
+    cooldown: float = 60.0
+    step: int = 2
+    interval: float = 15.0
+    queue: str = 'celery'
+    backlog_grace: float = 300.0
+
+    @classmethod
+    def from_env(cls) -> 'AutoscalerConfig':
+        return cls(
+            min_workers=int(os.getenv('AUTOSCALER_MIN_WORKERS', '1')),
+            max_workers=int(os.getenv('AUTOSCALER_MAX_WORKERS', '8')),
+            target_units_per_worker=float(os.getenv('AUTOSCALER_TARGET_UNITS_PER_WORKER', '600')),
+            cpus_per_worker=float(os.getenv('AUTOSCALER_CPUS_PER_WORKER', '1')),
+            memory_per_worker_mb=int(os.getenv('AUTOSCALER_MEMORY_PER_WORKER_MB', '1024')),
+            scale_up_after=int(os.getenv('AUTOSCALER_SCALE_UP_AFTER', '2')),
+            scale_down_after=int(os.getenv('AUTOSCALER_SCALE_DOWN_AFTER', '6')),
+            cooldown=float(os.getenv('AUTOSCALER_COOLDOWN', '60')),
+            step=int(os.getenv('AUTOSCALER_STEP', '2')),
+            interval=float(os.getenv('AUTOSCALER_INTERVAL', '15')),
+            queue=os.getenv('AUTOSCALER_QUEUE', 'celery'),
+            backlog_grace=float(os.getenv('AUTOSCALER_BACKLOG_GRACE', '300')),
+        )
+
+
+class CeleryPoolControl:
+    """Reads and resizes worker pools through Celery remote control commands"""
+
+    def __init__(self, app=celery, timeout: float = 5.0):
+        self.app = app
+        self.timeout = timeout
+
+    def get_workers(self) -> Dict[str, Dict[str, Any]]:
+        """Get pool size, active task count and held task ids per worker node"""
+        inspect = self.app.control.inspect(timeout=self.timeout)
+        stats = inspect.stats() or {}
+        active = inspect.active() or {}
+        reserved = inspect.reserved() or {}
+
+        workers = {}
+        for hostname, worker_stats in stats.items():
+            pool = worker_stats.get('pool', {})
+            size = len(pool.get('processes') or []) or pool.get('max-concurrency', 0)
+            workers[hostname] = {
+                'size': size,
+                'active': len(active.get(hostname) or []),
+                'tasks': [
+                    task['id'] for task in (active.get(hostname) or []) + (reserved.get(hostname) or [])
+                ]
+            }
+        return workers
+
+    def grow(self, hostname: str, n: int) -> None:
+        self.app.control.pool_grow(n, destination=[hostname], reply=True, timeout=self.timeout)
+
+    def shrink(self, hostname: str, n: int) -> None:
+        self.app.control.pool_shrink(n, destination=[hostname], reply=True, timeout=self.timeout)
+
+
+class WorkerAutoscaler:
+    """
+    Sizes worker pools from queue depth, active tasks and the estimated backlog.
+    A resize needs the same decision on several consecutive ticks and is followed
+    by a cooldown, so short bursts do not make the pool flap.
+    """
+
+    def __init__(self, pool, config: Optional[AutoscalerConfig] = None,
+                 redis_manager: Optional[RedisManager] = None,
+                 clock: Callable[[], float] = time.time):
+        self.pool = pool
+        self.config = config or AutoscalerConfig.from_env()
+        self.redis_manager = redis_manager or RedisManager()
+        self.clock = clock
+        self._up_ticks = 0
+        self._down_ticks = 0
+        self._last_scaled = None
+
+    def get_metrics(self, worker_task_ids: Set[str]) -> Dict[str, Any]:
+        """
+        Read queue depth and the estimated backlog of queued tasks from Redis.
+        Estimates for tasks that are neither queued nor held by a worker (revoked,
+        lost messages) are pruned once they are older than the grace period.
+        """
+        queued_ids = set(self.redis_manager.get_queued_task_ids(self.config.queue))
+        now = self.clock()
+        backlog_tasks = 0
+        backlog_units = 0.0
+        for task_id, entry in self.redis_manager.get_backlog_entries().items():
+            if task_id in queued_ids:
+                backlog_tasks += 1
+                backlog_units += entry['units']
+            elif task_id not in worker_task_ids and now - entry['queued_at'] > self.config.backlog_grace:
+                logger.info(f"Pruning stale backlog entry for task {task_id}")
+                self.redis_manager.remove_backlog(task_id)
+
+        return {
+            'queue_depth': len(queued_ids),
+            'backlog_tasks': backlog_tasks,
+            'backlog_units': backlog_units,
+        }
+
+    def get_worker_cap(self, hostname: str) -> int:
+        """Largest pool a worker node can run within its CPU and memory limits"""
+        cap = self.config.max_workers
+        limits = self.redis_manager.get_worker_limits(hostname)
+        if limits:
+            if limits.get('cpus'):
+                cap = min(cap, int(float(limits['cpus']) / self.config.cpus_per_worker))
+            if limits.get('memory_mb'):
+                cap = min(cap, int(float(limits['memory_mb']) // self.config.memory_per_worker_mb))
+        return max(cap, self.config.min_workers)
+
+    def get_desired_workers(self, metrics: Dict[str, Any], active: int) -> int:
+        """Pool processes needed for running tasks plus the queued backlog"""
+        # Queued tasks without an estimate (e.g. queued directly) count as default work
+        untracked = max(0, metrics['queue_depth'] - metrics['backlog_tasks'])
+        units = metrics['backlog_units'] + untracked * DEFAULT_WORK_UNITS
+        queued = min(metrics['queue_depth'], math.ceil(units / self.config.target_units_per_worker))
+        return active + queued
+
+    def step(self) -> Optional[str]:
+        """Run one control tick. Returns a description of any resize performed."""
+        workers = self.pool.get_workers()
+        if not workers:
+            logger.warning("No workers responded, skipping autoscale tick")
+            return None
+
+        metrics = self.get_metrics({
+            task_id for worker in workers.values() for task_id in worker.get('tasks', [])
+        })
+        caps = {hostname: self.get_worker_cap(hostname) for hostname in workers}
+        current = sum(worker['size'] for worker in workers.values())
+        active = sum(worker['active'] for worker in workers.values())
+        desired = self.get_desired_workers(metrics, active)
+        desired = max(len(workers) * self.config.min_workers, min(desired, sum(caps.values())))
+
+        logger.info(
+            f"Autoscale tick: queue={metrics['queue_depth']} backlog={metrics['backlog_units']:.0f} units "
+            f"active={active} pool={current} desired={desired}"
+        )
+
+        if desired > current:
+            self._up_ticks += 1
+            self._down_ticks = 0
+        elif desired < current:
+            self._down_ticks += 1
+            self._up_ticks = 0
+        else:
+            self._up_ticks = self._down_ticks = 0
+            return None
+
+        now = self.clock()
+        if self._last_scaled is not None and now - self._last_scaled < self.config.cooldown:
+            return None
+
+        if self._up_ticks >= self.config.scale_up_after:
+            action = self._grow(min(self.config.step, desired - current), workers, caps)
+        elif self._down_ticks >= self.config.scale_down_after:
+            action = self._shrink(min(self.config.step, current - desired), workers)
+        else:
+            return None
+
+        if action:
+            self._last_scaled = now
+            self._up_ticks = self._down_ticks = 0
+        return action
+
+    def _grow(self, n: int, workers: Dict[str, Dict[str, int]], caps: Dict[str, int]) -> Optional[str]:
+        """Add processes to the nodes with the most headroom"""
+        sizes = {hostname: worker['size'] for hostname, worker in workers.items()}
+        added: Dict[str, int] = {}
+        for _ in range(n):
+            hostname = max(sizes, key=lambda h: caps[h] - sizes[h])
+            if caps[hostname] - sizes[hostname] <= 0:
+                break
+            sizes[hostname] += 1
+            added[hostname] = added.get(hostname, 0) + 1
+
+        for hostname, count in added.items():
+            logger.info(f"Growing pool of {hostname} by {count}")
+            self.pool.grow(hostname, count)
+        return f"grow {added}" if added else None
+
+    def _shrink(self, n: int, workers: Dict[str, Dict[str, int]]) -> Optional[str]:
+        """Remove idle processes only, so running jobs are never interrupted"""
+        idle = {
+            hostname: min(worker['size'] - worker['active'], worker['size'] - self.config.min_workers)
+            for hostname, worker in workers.items()
+        }
+        removed: Dict[str, int] = {}
+        for _ in range(n):
+            hostname = max(idle, key=idle.get)
+            if idle[hostname] <= 0:
+                break
+            idle[hostname] -= 1
+            removed[hostname] = removed.get(hostname, 0) + 1
+
+        if not removed:
+            logger.info("Waiting for busy workers to drain before shrinking")
+            return None
+
+        for hostname, count in removed.items():
+            logger.info(f"Shrinking pool of {hostname} by {count}")
+            self.pool.shrink(hostname, count)
+        return f"shrink {removed}"
+
+    def run(self) -> None:
+        """Run the control loop until interrupted"""
+        logger.info(f"Starting worker autoscaler: {self.config}")
+        while True:
+            try:
+                self.step()
+            except Exception:
+                logger.exception("Autoscale tick failed")
+            time.sleep(self.config.interval)
+
+
+class SimulatedPool:
+    """
+    In-memory worker pool for exercising the autoscaler against a local Redis.
+    Processes take jobs from the queue and work through their estimated units.
+    """
+
+    def __init__(self, redis_manager: RedisManager, queue: str,
+                 size: int = 1, speed: float = 1.0, hostname: str = 'sim@localhost'):
+        self.redis_manager = redis_manager
+        self.queue = queue
+        self.speed = speed
+        self.hostname = hostname
+        self.size = size
+        self.jobs: Dict[str, float] = {}
+        self.completed = 0
+
+    def get_workers(self) -> Dict[str, Dict[str, int]]:
+        return {self.hostname: {'size': self.size, 'active': len(self.jobs), 'tasks': list(self.jobs)}}
+
+    def grow(self, hostname: str, n: int) -> None:
+        self.size += n
+
+    def shrink(self, hostname: str, n: int) -> None:
+        if self.size - len(self.jobs) < n:
+            raise ValueError("Can't shrink pool. All processes busy!")
+        self.size -= n
+
+    def advance(self, seconds: float) -> None:
+        """Work on running jobs for the given time, then pick up queued jobs"""
+        for task_id in list(self.jobs):
+            self.jobs[task_id] -= seconds * self.speed
+            if self.jobs[task_id] <= 0:
+                del self.jobs[task_id]
+                self.completed += 1
+
+        redis = self.redis_manager.redis
+        while len(self.jobs) < self.size:
+            message = redis.lpop(self.queue)
+            if message is None:
+                break
+            task_id = json.loads(message)['headers']['id']
+            entry = redis.hget('queue:backlog', task_id)
+            self.redis_manager.remove_backlog(task_id)
+            self.jobs[task_id] = json.loads(entry)['units'] if entry else DEFAULT_WORK_UNITS
+
+
+def simulate(redis_url: str, ticks: int, base_rate: float, peak_rate: float,
+             mean_units: float, lost_rate: float = 0.0, seed: Optional[int] = None) -> None:
+    """
+    Drive the autoscaler with a simulated job stream: a quiet period, a peak,
+    then quiet again. Rates are jobs per tick, and lost_rate is the fraction of
+    messages that never reach the queue. Uses virtual time, so runs instantly.
+    """
+    rng = random.Random(seed)
+    config = AutoscalerConfig.from_env()
+    config.queue = 'autoscaler:simulation'
+    redis_manager = RedisManager(redis_url)
+    redis_manager.redis.delete(config.queue, 'queue:backlog')
+
+    clock = [0.0]
+    pool = SimulatedPool(redis_manager, config.queue, size=config.min_workers)
+    autoscaler = WorkerAutoscaler(pool, config, redis_manager, clock=lambda: clock[0])
+
+    for tick in range(ticks):
+        rate = peak_rate if ticks // 3 <= tick < 2 * ticks // 3 else base_rate
+        # Poisson arrivals via exponential inter-arrival times within the tick
+        elapsed = rng.expovariate(rate) if rate > 0 else 1.0
+        while elapsed < 1.0:
+            task_id = f"sim-{uuid.uuid4()}"
+            redis_manager.add_backlog(task_id, rng.expovariate(1 / mean_units), queued_at=clock[0])
+            # Lost messages leave a backlog entry behind for the autoscaler to prune
+            if rng.random() >= lost_rate:
+                # Minimal stand-in for a Celery message; only the task id is read
+                redis_manager.redis.rpush(config.queue, json.dumps({'headers': {'id': task_id}}))
+            elapsed += rng.expovariate(rate)
+
+        pool.advance(config.interval)
+        action = autoscaler.step()
+        logger.info(
+            f"Simulation tick={tick:4d} rate={rate:5.2f} queue={redis_manager.get_queue_depth(config.queue):4d} "
+            f"backlog={len(redis_manager.get_backlog_entries()):4d} active={len(pool.jobs):3d} "
+            f"pool={pool.size:3d} completed={pool.completed:5d}"
+            + (f" {action}" if action else "")
+        )
+        clock[0] += config.interval
+
+    redis_manager.redis.delete(config.queue, 'queue:backlog')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Queue-depth-driven Celery worker autoscaler")
+    parser.add_argument('--simulate', action='store_true',
+                        help="Run against a simulated pool and job stream instead of real workers")
+    parser.add_argument('--redis-url', default='redis://localhost:6379/15',
+                        help="Redis used by the simulation; its simulation queue and backlog are cleared")
+    parser.add_argument('--ticks', type=int, default=120)
+    parser.add_argument('--base-rate', type=float, default=0.05, help="Jobs per tick outside the peak")
+    parser.add_argument('--peak-rate', type=float, default=1.0, help="Jobs per tick during the peak")
+    parser.add_argument('--mean-units', type=float, default=120.0, help="Mean work units per job")
+    parser.add_argument('--lost-rate', type=float, default=0.0,
+                        help="Fraction of jobs whose message is lost, exercising backlog pruning")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    if args.simulate:
+        simulate(args.redis_url, args.ticks, args.base_rate, args.peak_rate, args.mean_units,
+                 args.lost_rate, args.seed)
+    else:
+        WorkerAutoscaler(CeleryPoolControl()).run()
+
+
+if __name__ == '__main__':
+    main()
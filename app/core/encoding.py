@@ -0,0 +1,158 @@
+from pathlib import Path
+import json
+import logging
+import os
+import subprocess
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Server-side encode profiles, trading encode speed against output quality/size.
+# Each profile has encoder arguments per codec family.
+ENCODE_PROFILES: Dict[str, Dict[str, List[str]]] = {
+    'fast': {
+        'h264': ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '23'],
+        'vp9': ['-c:v', 'libvpx-vp9', '-deadline', 'realtime', '-cpu-used', '8', '-crf', '36', '-b:v', '0'],
+        'aac': ['-c:a', 'aac', '-b:a', '128k'],
+        'opus': ['-c:a', 'libopus', '-b:a', '96k'],
+        'mp3': ['-c:a', 'libmp3lame', '-q:a', '4'],
+        'vorbis': ['-c:a', 'libvorbis', '-q:a', '4'],
+    },
+    'balanced': {
+        'h264': ['-c:v', 'libx264', '-preset', 'medium', '-crf', '20'],
+        'vp9': ['-c:v', 'libvpx-vp9', '-deadline', 'good', '-cpu-used', '4', '-crf', '32', '-b:v', '0'],
+        'aac': ['-c:a', 'aac', '-b:a', '192k'],
+        'opus': ['-c:a', 'libopus', '-b:a', '128k'],
+        'mp3': ['-c:a', 'libmp3lame', '-q:a', '2'],
+        'vorbis': ['-c:a', 'libvorbis', '-q:a', '6'],
+    },
+    'archival': {
+        'h264': ['-c:v', 'libx264', '-preset', 'slow', '-crf', '16'],
+        'vp9': ['-c:v', 'libvpx-vp9', '-deadline', 'good', '-cpu-used', '1', '-crf', '24', '-b:v', '0'],
+        'aac': ['-c:a', 'aac', '-b:a', '320k'],
+        'opus': ['-c:a', 'libopus', '-b:a', '192k'],
+        'mp3': ['-c:a', 'libmp3lame', '-q:a', '0'],
+        'vorbis': ['-c:a', 'libvorbis', '-q:a', '8'],
+    },
+}
+
+# Codec family profiles encode to for each output container
+CONTAINER_ENCODERS: Dict[str, Dict[str, str]] = {
+    '.mp4': {'video': 'h264', 'audio': 'aac'},
+    '.m4v': {'video': 'h264', 'audio': 'aac'},
+    '.mov': {'video': 'h264', 'audio': 'aac'},
+    '.mkv': {'video': 'h264', 'audio': 'aac'},
+    '.m4a': {'audio': 'aac'},
+    '.webm': {'video': 'vp9', 'audio': 'opus'},
+    '.mp3': {'audio': 'mp3'},
+    '.ogg': {'audio': 'vorbis'},
+}
+
+# Empty means FFmpeg's own encoder defaults, as before profiles existed
+DEFAULT_ENCODE_PROFILE = os.getenv('FFMPEG_DEFAULT_PROFILE', '') or None
+if DEFAULT_ENCODE_PROFILE is not None and DEFAULT_ENCODE_PROFILE not in ENCODE_PROFILES:
+    raise ValueError(
+        f"Invalid FFMPEG_DEFAULT_PROFILE '{DEFAULT_ENCODE_PROFILE}'. Available: {', '.join(ENCODE_PROFILES)}"
+    )
+
+# Relative cost per second of media, used to estimate queued work for the autoscaler
+TASK_WORK_WEIGHTS: Dict[str, float] = {
+    'captionize': 1.0,
+    'normalize': 0.25,
+    'custom': 1.0,
+}
+
+# Work units assumed when an input's size cannot be read
+DEFAULT_WORK_UNITS = float(os.getenv('DEFAULT_WORK_UNITS', '60'))
+# Bitrate assumed when estimating media duration from file size
+ESTIMATED_BITRATE_KBPS = float(os.getenv('ESTIMATED_BITRATE_KBPS', '5000'))
+
+
+def get_profile_args(profile: Optional[str], output_file: str, stream_type: str) -> Optional[List[str]]:
+    """
+    Get the encoder arguments a profile uses for one stream type of the output container.
+    An explicitly requested profile raises ValueError if the container has no matching
+    encoder; the server default quietly falls back to FFmpeg's own encoder choice.
+    """
+    explicit = profile is not None
+    profile = profile or DEFAULT_ENCODE_PROFILE
+    if profile is None:
+        return None
+    if profile not in ENCODE_PROFILES:
+        raise ValueError(f"Unknown encode profile '{profile}'. Available: {', '.join(ENCODE_PROFILES)}")
+
+    suffix = Path(output_file).suffix.lower()
+    family = CONTAINER_ENCODERS.get(suffix, {}).get(stream_type)
+    if family is None:
+        if explicit:
+            raise ValueError(f"Encode profile '{profile}' has no {stream_type} encoder for '{suffix}' files")
+        return None
+    return ENCODE_PROFILES[profile][family]
+
+
+def probe_media(file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Probe a media file with ffprobe.
+    Returns duration and first video/audio codec names, or None if probing fails.
+    """
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_streams', '-show_format', '-of', 'json', str(file_path)],
+            capture_output=True, text=True, timeout=60
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"ffprobe failed for {file_path}: {e}")
+        return None
+
+    if result.returncode != 0:
+        logger.warning(f"ffprobe failed for {file_path}: {result.stderr.strip()}")
+        return None
+
+    try:
+        data = json.loads(result.stdout)
+    except json.JSONDecodeError:
+        logger.warning(f"ffprobe returned invalid JSON for {file_path}")
+        return None
+
+    media_info = {
+        'duration': float(data.get('format', {}).get('duration') or 0),
+        'video_codec': None,
+        'audio_codec': None,
+    }
+    for stream in data.get('streams', []):
+        codec_type = stream.get('codec_type')
+        if codec_type in ('video', 'audio') and media_info[f'{codec_type}_codec'] is None:
+            media_info[f'{codec_type}_codec'] = stream.get('codec_name')
+    return media_info
+
+
+def plan_codecs(media_info: Optional[Dict[str, Any]], output_file: str,
+                video_filtered: bool, audio_filtered: bool,
+                profile: Optional[str] = None) -> List[str]:
+    """
+    Choose codec arguments per stream: stream-copy what is not filtered, since
+    default outputs keep the input's container, and encode the rest with the profile.
+    Streams the probe did not find are left alone.
+    """
+    args: List[str] = []
+    for stream_type, filtered in (('video', video_filtered), ('audio', audio_filtered)):
+        if media_info is not None and media_info[f'{stream_type}_codec'] is None:
+            continue
+        if filtered:
+            args.extend(get_profile_args(profile, output_file, stream_type) or [])
+        else:
+            args.extend([f'-c:{stream_type[0]}', 'copy'])
+    return args
+
+
+def estimate_work_units(task_type: str, input_file: str) -> float:
+    """
+    Estimate the work of a task as media seconds weighted by task type.
+    Duration is derived from file size so enqueueing never waits on ffprobe.
+    """
+    try:
+        size = os.path.getsize(input_file)
+    except OSError:
+        return DEFAULT_WORK_UNITS
+    media_seconds = size * 8 / 1000 / ESTIMATED_BITRATE_KBPS
+    return media_seconds * TASK_WORK_WEIGHTS.get(task_type, 1.0)
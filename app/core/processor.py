@@ -10,11 +10,14 @@ import requests
 from typing import List, Dict, Optional, Union, Any
 from celery import Task, shared_task
 import shlex
+import time
 
 # Import celery app instance and FileManager
 from app import celery
 from app.utils.redis_utils import RedisManager
 from app.utils.file_manager import FileManager
+from app.core.subtitles import preflight_subtitles
+from app.core.encoding import probe_media, plan_codecs, DEFAULT_ENCODE_PROFILE
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +29,15 @@ class FFmpegProcessor:
         ffmpeg_timeout = int(os.getenv('FFMPEG_TIMEOUT', '0'))
         self.ffmpeg_timeout = None if ffmpeg_timeout == 0 else ffmpeg_timeout
         self.file_manager = FileManager()
+        self._media_info: Dict[str, Optional[Dict[str, Any]]] = {}
+        # Set when the command only remuxes, so no encoder throughput is measured
+        self.stream_copy_only = False
+
+    def _probe_media(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """Probe an input once per task"""
+        if file_path not in self._media_info:
+            self._media_info[file_path] = probe_media(file_path)
+        return self._media_info[file_path]
 
     def _run_ffmpeg_process(self, command: List[str]) -> subprocess.CompletedProcess:
         """Run FFmpeg process with proper timeout handling"""
@@ -84,8 +96,13 @@ class FFmpegProcessor:
             raise
 
     def _get_ffmpeg_command(self, task_type: str, input_files: List[str], 
-                        output_file: str, custom_params: Optional[str] = None) -> List[str]:
-        """Build FFmpeg command based on task type"""
+                        output_file: str, custom_params: Optional[str] = None,
+                        profile: Optional[str] = None) -> List[str]:
+        """
+        Build FFmpeg command based on task type.
+        Default commands stream-copy whatever they do not filter and encode
+        the rest with the given profile.
+        """
         base_command = ['ffmpeg']
         
         if self.ffmpeg_threads != 'auto':
@@ -100,18 +117,24 @@ class FFmpegProcessor:
             
             base_command.extend(shlex.split(custom_params))
         else:
+            media_info = self._probe_media(input_files[0])
             if task_type == 'normalize':
                 base_command.extend([
                     '-i', input_files[0],
-                    '-filter:a', 'loudnorm',
-                    '-c:v', 'copy'
+                    '-filter:a', 'loudnorm'
                 ])
+                base_command.extend(plan_codecs(media_info, output_file, False, True, profile))
             elif task_type == 'captionize':
-                base_command.extend([
-                    '-i', input_files[0],
-                    '-vf', f'subtitles={input_files[1]}',
-                    '-c:a', 'copy'
-                ])
+                subtitle_info = preflight_subtitles(input_files[1])
+                base_command.extend(['-i', input_files[0]])
+                if subtitle_info.dialogue_count:
+                    base_command.extend(['-vf', f'subtitles={input_files[1]}'])
+                    base_command.extend(plan_codecs(media_info, output_file, True, False, profile))
+                else:
+                    # Nothing to burn in, so the container can just be remuxed
+                    logger.info(f"Subtitle file {input_files[1]} has no dialogue, remuxing without re-encoding")
+                    self.stream_copy_only = True
+                    base_command.extend(plan_codecs(media_info, output_file, False, False, profile))
 
         base_command.append(output_file)
         return base_command
@@ -187,18 +210,30 @@ class FFmpegTask(Task):
 @celery.task(base=FFmpegTask, bind=True, name='app.core.processor.process_ffmpeg')
 def process_ffmpeg(self, task_type: str, input_files: List[str], 
                   output_file: str, custom_params: Optional[str] = None,
-                  callback_url: Optional[str] = None):
+                  callback_url: Optional[str] = None, profile: Optional[str] = None):
     """Process FFmpeg task"""
     processor = FFmpegProcessor()
-    RedisManager().update_task_status(self.request.id, 'processing')
+    redis_manager = RedisManager()
+    redis_manager.update_task_status(self.request.id, 'processing')
     
     try:
-        command = processor._get_ffmpeg_command(task_type, input_files, output_file, custom_params)
+        command = processor._get_ffmpeg_command(task_type, input_files, output_file, custom_params, profile)
         logger.info("\033[32mcommand value is: %s\033[0m", command)
         logger.info(f"Executing FFmpeg command: {' '.join(command)}")
         
+        started_at = time.time()
         result = processor._run_ffmpeg_process(command)
-        logger.info(f"FFmpeg process completed successfully")
+        elapsed = time.time() - started_at
+        logger.info(f"FFmpeg process completed successfully in {elapsed:.1f}s")
+
+        # Record throughput per profile so speed/quality trade-offs can be compared
+        if not custom_params and not processor.stream_copy_only:
+            media_info = processor._probe_media(input_files[0])
+            if media_info and media_info['duration']:
+                redis_manager.record_profile_throughput(
+                    profile or DEFAULT_ENCODE_PROFILE or 'default',
+                    task_type, media_info['duration'], elapsed
+                )
         logger.info(f"FFmpeg stdout:\n{result.stdout}")
         logger.info(f"FFmpeg stderr:\n{result.stderr}")
         
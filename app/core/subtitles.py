@@ -0,0 +1,129 @@
+from pathlib import Path
+from dataclasses import dataclass
+from collections import OrderedDict
+import codecs
+import hashlib
+import logging
+import os
+import re
+import threading
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+PREFLIGHT_CACHE_SIZE = int(os.getenv('SUBTITLE_PREFLIGHT_CACHE_SIZE', '256'))
+
+# FFmpeg's ASS demuxer only probes a file whose first non-blank line is this header
+SCRIPT_INFO_HEADER = '[Script Info]'
+
+# Event format libass assumes when the section does not declare one
+DEFAULT_EVENT_FORMAT = [
+    'layer', 'start', 'end', 'style', 'name', 'marginl', 'marginr', 'marginv', 'effect', 'text'
+]
+
+# Matches what libass accepts via sscanf("%d:%d:%d.%d")
+_TIMESTAMP_RE = re.compile(r'^\d+:\d+:\d+[.:]\d+$')
+
+# Process-wide cache shared by every job handled in this process
+_preflight_cache: "OrderedDict[str, SubtitleInfo]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class SubtitleValidationError(ValueError):
+    """Raised when an ASS subtitle file cannot be rendered"""
+
+
+@dataclass
+class SubtitleInfo:
+    """Result of an ASS pre-flight check"""
+    dialogue_count: int = 0
+
+
+def _parse_format(line: str) -> List[str]:
+    return [column.strip().lower() for column in line.split(':', 1)[1].split(',')]
+
+
+def _parse_ass(content: str) -> SubtitleInfo:
+    """
+    Parse ASS content. Only what FFmpeg cannot open is rejected; lines libass
+    would skip are skipped here too, with a warning.
+    """
+    info = SubtitleInfo()
+    section = None
+    header_seen = False
+    event_format = DEFAULT_EVENT_FORMAT
+
+    for lineno, raw_line in enumerate(content.lstrip('\ufeff').splitlines(), start=1):
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        if not header_seen:
+            if raw_line.rstrip() != SCRIPT_INFO_HEADER:
+                raise SubtitleValidationError(f"First line must be {SCRIPT_INFO_HEADER}")
+            header_seen = True
+            section = 'script info'
+            continue
+
+        if line.startswith(';'):
+            continue
+
+        if line.startswith('[') and line.endswith(']'):
+            section = line[1:-1].strip().lower()
+            continue
+
+        if ':' not in line:
+            continue
+        key = line.split(':', 1)[0].strip().lower()
+
+        if section == 'events':
+            if key == 'format':
+                event_format = _parse_format(line)
+            elif key == 'dialogue':
+                values = line.split(':', 1)[1].split(',', len(event_format) - 1)
+                if len(values) != len(event_format):
+                    logger.warning(f"Skipping dialogue on line {lineno}: {len(values)} fields, expected {len(event_format)}")
+                    continue
+                event = dict(zip(event_format, (value.strip() for value in values)))
+                if any(column in event and not _TIMESTAMP_RE.match(event[column]) for column in ('start', 'end')):
+                    logger.warning(f"Skipping dialogue on line {lineno}: invalid timestamp")
+                    continue
+                info.dialogue_count += 1
+
+    if not header_seen:
+        raise SubtitleValidationError("Subtitle file is empty")
+    return info
+
+
+def preflight_subtitles(subtitle_path: str) -> SubtitleInfo:
+    """
+    Parse and validate an ASS file, returning how many dialogue lines it renders.
+    Results are cached by file content so identical subtitle files are parsed once.
+    """
+    try:
+        data = Path(subtitle_path).read_bytes()
+    except OSError as e:
+        raise SubtitleValidationError(f"Unable to read subtitle file: {e}")
+
+    digest = hashlib.sha256(data).hexdigest()
+    with _cache_lock:
+        cached = _preflight_cache.get(digest)
+        if cached is not None:
+            _preflight_cache.move_to_end(digest)
+            return cached
+
+    if data.startswith(codecs.BOM_UTF8):
+        data = data[len(codecs.BOM_UTF8):]
+    try:
+        content = data.decode('utf-8')
+    except UnicodeDecodeError:
+        # libass renders legacy encodings too; decode losslessly just to validate structure
+        logger.warning(f"Subtitle file {subtitle_path} is not UTF-8, parsing as Latin-1")
+        content = data.decode('latin-1')
+
+    info = _parse_ass(content)
+    with _cache_lock:
+        _preflight_cache[digest] = info
+        while len(_preflight_cache) > PREFLIGHT_CACHE_SIZE:
+            _preflight_cache.popitem(last=False)
+    return info
@@ -6,6 +6,8 @@ import uuid
 import mimetypes
 import logging
 from app.core.processor import process_ffmpeg
+from app.core.subtitles import preflight_subtitles, SubtitleValidationError
+from app.core.encoding import get_profile_args, estimate_work_units
 from app.utils.redis_utils import RedisManager
 from app.utils.file_manager import FileManager
 
@@ -51,6 +53,58 @@ def save_uploaded_file(file, prefix: str) -> Path:
     file.save(str(temp_path))
     return temp_path
 
+def enqueue_task(task_type: str, input_files, output_file: str, custom_params=None, **kwargs):
+    """Queue an FFmpeg task, recording its estimated work for the autoscaler"""
+    task_id = str(uuid.uuid4())
+    redis_manager.add_backlog(task_id, estimate_work_units(task_type, input_files[0]))
+    try:
+        return process_ffmpeg.apply_async(
+            (task_type, input_files, output_file, custom_params),
+            kwargs,
+            task_id=task_id
+        )
+    except Exception:
+        redis_manager.remove_backlog(task_id)
+        raise
+
+def claim_uploaded_file(upload_id: str, prefix: str) -> Path:
+    """Move a completed resumable upload into place as a task input file"""
+    upload_info = redis_manager.claim_upload(upload_id)
+    if not upload_info:
+        raise ValueError(f"Upload '{upload_id}' is not completed or has already been used")
+    temp_path = Path('/tmp/ffmpeg_api') / f"{prefix}_{uuid.uuid4()}_{upload_info['filename']}"
+    try:
+        Path(upload_info['path']).rename(temp_path)
+    except OSError as e:
+        logger.error(f"Unable to claim upload {upload_id} from {upload_info['path']}: {str(e)}")
+        raise ValueError(f"Upload '{upload_id}' data is no longer available")
+    return temp_path
+
+def get_input(field: str):
+    """
+    Get an input by field name, either as an uploaded file or as the id of a
+    completed resumable upload sent in its place.
+    Returns (filename, source) or (None, None) if the field is missing.
+    """
+    if field in request.files:
+        file = request.files[field]
+        return file.filename, file
+
+    upload_id = request.form.get(field)
+    if upload_id:
+        upload_info = redis_manager.get_upload_info(upload_id)
+        if not upload_info or upload_info.get('status') != 'completed':
+            raise ValueError(f"Upload '{upload_id}' for '{field}' is not completed")
+        return upload_info['filename'], upload_id
+
+    return None, None
+
+def save_input(source, prefix: str) -> Path:
+    """Save an input returned by get_input"""
+    if isinstance(source, str):
+        return claim_uploaded_file(source, prefix)
+    return save_uploaded_file(source, prefix)
+
 @bp.route('/captionize', methods=['POST'])
 def captionize_video():
     """Add subtitles to video"""
@@ -60,23 +114,26 @@ def captionize_video():
     logger.info(f"Files received: {list(request.files.keys())}")
     logger.info(f"Form data: {list(request.form.keys())}")
     
-    if 'input_video_file' not in request.files or 'input_ass_file' not in request.files:
+    try:
+        video_filename, video_source = get_input('input_video_file')
+        subtitle_filename, subtitle_source = get_input('input_ass_file')
+    except ValueError as e:
+        return jsonify({"error": "Invalid upload id", "details": str(e)}), 400
+
+    if video_source is None or subtitle_source is None:
         return jsonify({
             "error": "Both video and ASS subtitle files are required",
-            "details": "Use 'input_video_file' for video and 'input_ass_file' for ASS subtitle file. Note: Only .ass subtitle files are supported."
+            "details": "Use 'input_video_file' for video and 'input_ass_file' for ASS subtitle file, either as file uploads or as completed upload ids. Note: Only .ass subtitle files are supported."
         }), 400
-        
-    video_file = request.files['input_video_file']
-    subtitle_file = request.files['input_ass_file']
     
     # Validate file names
-    if video_file.filename == '':
+    if video_filename == '':
         return jsonify({"error": "No video file selected"}), 400
-    if subtitle_file.filename == '':
+    if subtitle_filename == '':
         return jsonify({"error": "No ASS subtitle file selected"}), 400
 
     # Validate subtitle file extension
-    if not subtitle_file.filename.lower().endswith('.ass'):
+    if not subtitle_filename.lower().endswith('.ass'):
         return jsonify({
             "error": "Invalid subtitle file format",
             "details": "Only .ass subtitle files are supported. Other formats like .srt, .vtt, etc. are not supported."
@@ -89,22 +146,52 @@ def captionize_video():
             "error": "Invalid custom command",
             "details": "Custom command must contain both '{video}' and '{subtitle}' placeholders. Example: -i {video} -vf subtitles={subtitle} -c:a copy"
         }), 400
+
+    profile = request.form.get('profile') or None
+    if profile:
+        try:
+            get_profile_args(profile, video_filename, 'video')
+        except ValueError as e:
+            return jsonify({
+                "error": "Invalid encode profile",
+                "details": f"{e}. Profiles apply only when no custom_command is given."
+            }), 400
     
-    # Save uploaded files with appropriate prefixes
-    video_path = save_uploaded_file(video_file, 'video')
-    subtitle_path = save_uploaded_file(subtitle_file, 'sub')
+    # Save and check the subtitle first, so a bad subtitle never consumes a video upload
+    try:
+        subtitle_path = save_input(subtitle_source, 'sub')
+    except ValueError as e:
+        return jsonify({"error": "Invalid upload id", "details": str(e)}), 400
+
+    # Reject malformed subtitle files before a worker starts FFmpeg
+    try:
+        preflight_subtitles(str(subtitle_path))
+    except SubtitleValidationError as e:
+        file_manager.cleanup_input_files([subtitle_path])
+        return jsonify({
+            "error": "Invalid ASS subtitle file",
+            "details": str(e)
+        }), 400
+
+    try:
+        video_path = save_input(video_source, 'video')
+    except ValueError as e:
+        file_manager.cleanup_input_files([subtitle_path])
+        return jsonify({"error": "Invalid upload id", "details": str(e)}), 400
+
     output_path = video_path.parent / f"captionized_{uuid.uuid4()}_{video_path.name}"
 
     # Start processing task
-    task = process_ffmpeg.delay(
+    task = enqueue_task(
         'captionize',
         [str(video_path), str(subtitle_path)],
         str(output_path),
         custom_command,
-        callback_url=callback_url
+        callback_url=callback_url,
+        profile=profile
     )
 
-    logger.info(f"Started captionize task {task.id} for files: video={video_file.filename}, sub={subtitle_file.filename}")
+    logger.info(f"Started captionize task {task.id} for files: video={video_filename}, sub={subtitle_filename}")
     
     if callback_url:
         response = {
@@ -127,7 +214,7 @@ def captionize_video():
         return send_file_and_cleanup(
             result,
             mime_type,
-            f"captionized_{video_file.filename}"
+            f"captionized_{video_filename}"
         )
         
     except Exception as e:
@@ -136,15 +223,18 @@ def captionize_video():
 @bp.route('/normalize', methods=['POST'])
 def normalize_audio():
     """Normalize audio levels in video/audio file"""
-    if 'input_file' not in request.files:
+    try:
+        input_filename, input_source = get_input('input_file')
+    except ValueError as e:
+        return jsonify({"error": "Invalid upload id", "details": str(e)}), 400
+
+    if input_source is None:
         return jsonify({
             "error": "Input file is required",
-            "details": "Use 'input_file' parameter to upload video or audio file"
+            "details": "Use 'input_file' parameter to upload video or audio file, or to pass a completed upload id"
         }), 400
-        
-    input_file = request.files['input_file']
     
-    if input_file.filename == '':
+    if input_filename == '':
         return jsonify({"error": "No file selected"}), 400
 
     callback_url = request.form.get('callback_url')
@@ -154,18 +244,32 @@ def normalize_audio():
             "error": "Invalid custom command",
             "details": "Custom command must contain '{input}' placeholder. Example: -i {input} -filter:a volume=2.0"
         }), 400
+
+    profile = request.form.get('profile') or None
+    if profile:
+        try:
+            get_profile_args(profile, input_filename, 'audio')
+        except ValueError as e:
+            return jsonify({
+                "error": "Invalid encode profile",
+                "details": f"{e}. Profiles apply only when no custom_command is given."
+            }), 400
     
     # Save uploaded file
-    input_path = save_uploaded_file(input_file, 'input')
+    try:
+        input_path = save_input(input_source, 'input')
+    except ValueError as e:
+        return jsonify({"error": "Invalid upload id", "details": str(e)}), 400
     output_path = input_path.parent / f"normalized_{uuid.uuid4()}_{input_path.name}"
     
     # Start processing task
-    task = process_ffmpeg.delay(
+    task = enqueue_task(
         'normalize',
         [str(input_path)],
         str(output_path),
         custom_command,
-        callback_url=callback_url
+        callback_url=callback_url,
+        profile=profile
     )
     
     if callback_url:
@@ -187,7 +291,7 @@ def normalize_audio():
         return send_file_and_cleanup(
             result,
             mime_type,
-            f"normalized_{input_file.filename}"
+            f"normalized_{input_filename}"
         )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -198,8 +302,13 @@ def custom_ffmpeg():
     Custom FFmpeg processing supporting multiple input files.
     Files should be uploaded with incrementing indices:
     input_video[0], input_video[1], input_audio[0], input_audio[1], etc.
+    Completed upload ids may be sent as form values under the same names.
     """
-    if not request.files:
+    input_keys = [
+        key for key in list(request.files) + list(request.form)
+        if key.startswith(('input_video', 'input_audio'))
+    ]
+    if not input_keys:
         return jsonify({
             "error": "No input files provided",
             "details": "Provide input files with indexed names: input_video[0], input_video[1], input_audio[0], etc."
@@ -216,9 +325,13 @@ def custom_ffmpeg():
     file_paths = {}
     
     # Process all uploaded files
-    for key in request.files:
-        file = request.files[key]
-        if file.filename == '':
+    for key in input_keys:
+        try:
+            filename, source = get_input(key)
+        except ValueError as e:
+            file_manager.cleanup_input_files(list(input_files.values()))
+            return jsonify({"error": "Invalid upload id", "details": str(e)}), 400
+        if not filename:
             continue
             
         # Save file with appropriate prefix
@@ -233,15 +346,21 @@ def custom_ffmpeg():
             
         try:
             idx = int(key[key.index('[')+1:key.index(']')])
-            saved_path = save_uploaded_file(file, f"{prefix}{idx}")
-            file_paths[f"{type_key}{idx}"] = str(saved_path)
-            input_files[key] = saved_path
         except (ValueError, IndexError):
+            file_manager.cleanup_input_files(list(input_files.values()))
             return jsonify({
                 "error": "Invalid file parameter format",
                 "details": "Use format: input_video[0], input_video[1], input_audio[0], etc."
             }), 400
 
+        try:
+            saved_path = save_input(source, f"{prefix}{idx}")
+        except ValueError as e:
+            file_manager.cleanup_input_files(list(input_files.values()))
+            return jsonify({"error": "Invalid upload id", "details": str(e)}), 400
+        file_paths[f"{type_key}{idx}"] = str(saved_path)
+        input_files[key] = saved_path
+
     if not input_files:
         return jsonify({"error": "No valid input files provided"}), 400
 
@@ -258,7 +377,7 @@ def custom_ffmpeg():
     ffmpeg_timeout = int(os.getenv('FFMPEG_TIMEOUT', '0'))
 
     # Start processing task with callback URL
-    task = process_ffmpeg.delay(
+    task = enqueue_task(
         'custom',
         list(file_paths.values()),
         str(output_path),
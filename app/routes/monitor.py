@@ -20,6 +20,11 @@ def get_tasks():
     tasks = redis_manager.get_tasks(status, limit, offset)
     return jsonify(tasks)
 
+@bp.route('/profiles')
+def get_profile_stats():
+    """Get per-profile encode throughput"""
+    return jsonify(redis_manager.get_profile_stats())
+
 @bp.route('/task/<task_id>/file')
 def get_task_file_status(task_id):
     """Get status of file processing and delivery for a specific task"""
@@ -0,0 +1,258 @@
+from flask import Blueprint, request, jsonify
+from werkzeug.utils import secure_filename
+import os
+from pathlib import Path
+import uuid
+import time
+import logging
+from app.utils.redis_utils import RedisManager
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('uploads', __name__)
+redis_manager = RedisManager()
+
+UPLOAD_DIR = Path('/tmp/ffmpeg_api') / 'uploads'
+CHUNK_READ_SIZE = 1024 * 1024
+MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', str(20 * 1024 ** 3)))
+# Files younger than this are never swept, so a just-created upload is safe
+SWEEP_GRACE_PERIOD = 300
+
+def sweep_uploads():
+    """Delete upload files whose Redis record has expired or been removed"""
+    if not UPLOAD_DIR.is_dir():
+        return
+    now = time.time()
+    for path in UPLOAD_DIR.iterdir():
+        # Files are named '<id>.part' while uploading and '<id>_<filename>' once completed
+        upload_id = path.name[:36]
+        try:
+            if now - path.stat().st_mtime < SWEEP_GRACE_PERIOD:
+                continue
+            if redis_manager.get_upload_info(upload_id) is None:
+                path.unlink()
+                logger.info(f"Removed abandoned upload file: {path}")
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            logger.error(f"Error sweeping upload file {path}: {str(e)}")
+
+def get_missing_ranges(ranges, size: int):
+    """Return the byte ranges not yet received"""
+    missing = []
+    position = 0
+    for start, end in ranges:
+        if start > position:
+            missing.append([position, start])
+        position = max(position, end)
+    if position < size:
+        missing.append([position, size])
+    return missing
+
+def write_chunk(path: str, offset: int, length: int) -> int:
+    """Stream the request body into the upload file at offset, returning the bytes written"""
+    written = 0
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        while written < length:
+            block = request.stream.read(min(CHUNK_READ_SIZE, length - written))
+            if not block:
+                break
+            os.pwrite(fd, block, offset + written)
+            written += len(block)
+    finally:
+        os.close(fd)
+    return written
+
+def upload_status(upload_id: str, upload_info: dict):
+    """Build the progress response for an upload"""
+    size = int(upload_info['size'])
+    ranges = redis_manager.get_upload_ranges(upload_id)
+    return {
+        'upload_id': upload_id,
+        'status': upload_info['status'],
+        'filename': upload_info['filename'],
+        'size': size,
+        'received': sum(end - start for start, end in ranges),
+        'missing_ranges': get_missing_ranges(ranges, size)
+    }
+
+@bp.route('', methods=['POST'])
+def create_upload():
+    """
+    Create a resumable upload.
+    Expects JSON: {"filename": "movie.mp4", "size": <total bytes>}
+    """
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('filename') or '')
+    size = data.get('size')
+
+    if not filename:
+        return jsonify({
+            "error": "Filename is required",
+            "details": "Provide JSON with 'filename' and 'size' (total bytes)"
+        }), 400
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        return jsonify({
+            "error": "Invalid upload size",
+            "details": "'size' must be a positive integer number of bytes"
+        }), 400
+    if size > MAX_UPLOAD_SIZE:
+        return jsonify({
+            "error": "Upload too large",
+            "details": f"Maximum upload size is {MAX_UPLOAD_SIZE} bytes"
+        }), 413
+
+    sweep_uploads()
+
+    upload_id = str(uuid.uuid4())
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    part_path = UPLOAD_DIR / f"{upload_id}.part"
+
+    # Allocate the full file so chunks can be written at any offset
+    try:
+        with open(part_path, 'wb') as f:
+            f.truncate(size)
+    except OSError as e:
+        part_path.unlink(missing_ok=True)
+        logger.error(f"Unable to allocate upload {upload_id} ({size} bytes): {str(e)}")
+        return jsonify({"error": "Unable to allocate upload", "details": str(e)}), 507
+
+    redis_manager.create_upload(upload_id, filename, size, str(part_path))
+    logger.info(f"Created upload {upload_id} for {filename} ({size} bytes)")
+
+    return jsonify({
+        'upload_id': upload_id,
+        'size': size,
+        'upload_url': f'/api/uploads/{upload_id}'
+    }), 201
+
+@bp.route('/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    """
+    Write a chunk at the byte offset given by the 'offset' query parameter.
+    Chunks may be sent in parallel and retried; re-sending a chunk overwrites it.
+    """
+    upload_info = redis_manager.get_upload_info(upload_id)
+    if not upload_info:
+        return jsonify({'error': 'Upload not found'}), 404
+    if upload_info['status'] != 'uploading':
+        return jsonify({'error': f"Upload is already {upload_info['status']}"}), 409
+
+    try:
+        offset = int(request.args['offset'])
+    except (KeyError, ValueError):
+        return jsonify({
+            "error": "Invalid chunk offset",
+            "details": "Provide the chunk's byte offset as the 'offset' query parameter"
+        }), 400
+
+    size = int(upload_info['size'])
+    length = request.content_length
+    if length is None:
+        return jsonify({"error": "Content-Length header is required"}), 411
+    if offset < 0 or length <= 0 or offset + length > size:
+        return jsonify({
+            "error": "Chunk out of range",
+            "details": f"Chunk [{offset}, {offset + length}) does not fit in upload of {size} bytes"
+        }), 416
+
+    # Complete waits for registered writers, so a chunk never lands in a finalized file
+    token = str(uuid.uuid4())
+    if not redis_manager.begin_upload_chunk(upload_id, token):
+        return jsonify({'error': 'Upload is no longer accepting chunks'}), 409
+
+    try:
+        written = write_chunk(upload_info['path'], offset, length)
+    except FileNotFoundError:
+        # The upload was deleted while this chunk was in flight
+        written = None
+    except Exception:
+        redis_manager.end_upload_chunk(upload_id, token)
+        raise
+
+    recorded = redis_manager.end_upload_chunk(
+        upload_id, token, offset, length if written == length else None
+    )
+    if written is None or (written == length and not recorded):
+        return jsonify({'error': 'Upload is no longer accepting chunks'}), 409
+
+    if written != length:
+        logger.warning(f"Incomplete chunk for upload {upload_id} at offset {offset}: {written}/{length} bytes")
+        return jsonify({
+            "error": "Incomplete chunk",
+            "details": f"Received {written} of {length} bytes, resend the chunk"
+        }), 400
+
+    return jsonify(upload_status(upload_id, upload_info))
+
+@bp.route('/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Get upload progress, including the byte ranges still missing"""
+    upload_info = redis_manager.get_upload_info(upload_id)
+    if not upload_info:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(upload_status(upload_id, upload_info))
+
+@bp.route('/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    """Finalize an upload once every byte has been received"""
+    upload_info = redis_manager.get_upload_info(upload_id)
+    if not upload_info:
+        return jsonify({'error': 'Upload not found'}), 404
+    if upload_info['status'] == 'completed':
+        return jsonify(upload_status(upload_id, upload_info))
+
+    result = redis_manager.begin_upload_finalize(upload_id)
+    if result == 'completed':
+        # A concurrent request finalized it first
+        upload_info = redis_manager.get_upload_info(upload_id)
+        if upload_info:
+            return jsonify(upload_status(upload_id, upload_info))
+        result = 'missing'
+    if result == 'missing':
+        return jsonify({'error': 'Upload not found'}), 404
+    if result == 'writing':
+        return jsonify({
+            "error": "Chunks are still being written",
+            "details": "Retry once in-flight chunk uploads have finished"
+        }), 409
+    if result != 'ok':
+        return jsonify({'error': f"Upload is already {result}"}), 409
+
+    # No writers remain and new chunks are refused, so the received ranges are final
+    status = upload_status(upload_id, upload_info)
+    if status['missing_ranges']:
+        redis_manager.transition_upload(upload_id, 'finalizing', 'uploading')
+        return jsonify({
+            "error": "Upload is incomplete",
+            "details": status
+        }), 409
+
+    part_path = Path(upload_info['path'])
+    final_path = part_path.with_name(f"{upload_id}_{upload_info['filename']}")
+    try:
+        part_path.rename(final_path)
+    except FileNotFoundError:
+        # The upload was deleted while it was being finalized
+        return jsonify({'error': 'Upload not found'}), 404
+
+    upload_info = redis_manager.transition_upload(upload_id, 'finalizing', 'completed', path=str(final_path))
+    if not upload_info:
+        final_path.unlink(missing_ok=True)
+        return jsonify({'error': 'Upload not found'}), 404
+    logger.info(f"Completed upload {upload_id} ({upload_info['size']} bytes)")
+
+    return jsonify(upload_status(upload_id, upload_info))
+
+@bp.route('/<upload_id>', methods=['DELETE'])
+def delete_upload(upload_id):
+    """Abort an upload and remove its data"""
+    upload_info = redis_manager.get_upload_info(upload_id)
+    if not upload_info:
+        return jsonify({'error': 'Upload not found'}), 404
+
+    redis_manager.delete_upload(upload_id)
+    Path(upload_info['path']).unlink(missing_ok=True)
+    logger.info(f"Deleted upload {upload_id}")
+    return '', 204
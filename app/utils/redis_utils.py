@@ -2,14 +2,64 @@ from redis import Redis
 import json
 import time
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+
+# Upload state changes run as Lua scripts so a check and its write are atomic,
+# and so a request racing a DELETE never recreates the upload's keys
+
+# KEYS: info, writers  ARGV: token, now, expiry
+_BEGIN_UPLOAD_CHUNK = """
+if redis.call('HGET', KEYS[1], 'status') ~= 'uploading' then return 0 end
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return 1
+"""
+
+# KEYS: info, chunks, writers  ARGV: token, offset, length ('' records nothing), now, expiry
+_END_UPLOAD_CHUNK = """
+redis.call('ZREM', KEYS[3], ARGV[1])
+if ARGV[3] == '' or redis.call('HGET', KEYS[1], 'status') ~= 'uploading' then return 0 end
+redis.call('HSET', KEYS[2], ARGV[2], ARGV[3])
+redis.call('HSET', KEYS[1], 'updated_at', ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return 1
+"""
+
+# KEYS: info, writers  ARGV: stale writer cutoff, now
+_BEGIN_UPLOAD_FINALIZE = """
+local status = redis.call('HGET', KEYS[1], 'status')
+if not status then return 'missing' end
+if status ~= 'uploading' then return status end
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[2]) > 0 then return 'writing' end
+redis.call('HSET', KEYS[1], 'status', 'finalizing', 'updated_at', ARGV[2])
+return 'ok'
+"""
+
+# KEYS: info  ARGV: from status, to status, now, path ('' keeps the current path)
+_TRANSITION_UPLOAD = """
+if redis.call('HGET', KEYS[1], 'status') ~= ARGV[1] then return nil end
+redis.call('HSET', KEYS[1], 'status', ARGV[2], 'updated_at', ARGV[3])
+if ARGV[4] ~= '' then redis.call('HSET', KEYS[1], 'path', ARGV[4]) end
+return redis.call('HGETALL', KEYS[1])
+"""
 
 class RedisManager:
-    def __init__(self):
+    def __init__(self, url: Optional[str] = None):
         self.redis = Redis.from_url(
-            os.environ.get('CELERY_BROKER_URL', 'redis://redis:6379/0'),
+            url or os.environ.get('CELERY_BROKER_URL', 'redis://redis:6379/0'),
             decode_responses=True
         )
+        self.upload_expiry = int(os.environ.get('UPLOAD_EXPIRY', '86400'))
+        # Workers refresh their published limits well within this, so a dead worker's expire
+        self.worker_limits_expiry = int(os.environ.get('WORKER_LIMITS_EXPIRY', '300'))
+        # A chunk writer older than this is assumed to have died mid-request
+        self.upload_writer_timeout = int(os.environ.get('UPLOAD_WRITER_TIMEOUT', '600'))
+        self._begin_upload_chunk = self.redis.register_script(_BEGIN_UPLOAD_CHUNK)
+        self._end_upload_chunk = self.redis.register_script(_END_UPLOAD_CHUNK)
+        self._begin_upload_finalize = self.redis.register_script(_BEGIN_UPLOAD_FINALIZE)
+        self._transition_upload = self.redis.register_script(_TRANSITION_UPLOAD)
 
     def update_task_status(self, task_id: str, status: str, 
                           result: Optional[str] = None, 
@@ -34,11 +84,13 @@ class RedisManager:
         if status == 'processing':
             self.redis.sadd('queue:active', task_id)
             self.redis.srem('queue:pending', task_id)
+            self.redis.hdel('queue:backlog', task_id)
         elif status == 'completed':
             self.redis.srem('queue:active', task_id)
             self.redis.zadd('queue:completed', {task_id: time.time()})
         elif status == 'failed':
             self.redis.srem('queue:active', task_id)
+            self.redis.hdel('queue:backlog', task_id)
             self.redis.hset('queue:failed', task_id, error or 'Unknown error')
 
     def get_queue_stats(self) -> Dict[str, Any]:
@@ -57,7 +109,176 @@ class RedisManager:
             'recent_failures': self.redis.hlen('queue:failed'),
         }
 
+    def add_backlog(self, task_id: str, work_units: float, queued_at: Optional[float] = None) -> None:
+        """Record the estimated work of a queued task"""
+        self.redis.hset('queue:backlog', task_id, json.dumps({
+            'units': work_units,
+            'queued_at': time.time() if queued_at is None else queued_at
+        }))
+
+    def remove_backlog(self, task_id: str) -> None:
+        """Forget the estimated work of a task that will not run"""
+        self.redis.hdel('queue:backlog', task_id)
+
+    def get_backlog_entries(self) -> Dict[str, Dict[str, float]]:
+        """Get the estimated work and enqueue time of every recorded task"""
+        return {
+            task_id: json.loads(value)
+            for task_id, value in self.redis.hgetall('queue:backlog').items()
+        }
+
+    def get_queue_depth(self, queue: str = 'celery') -> int:
+        """Get the number of messages waiting in a broker queue"""
+        return self.redis.llen(queue)
+
+    def get_queued_task_ids(self, queue: str = 'celery') -> List[str]:
+        """Get the ids of tasks whose messages are waiting in a broker queue"""
+        task_ids = []
+        for message in self.redis.lrange(queue, 0, -1):
+            try:
+                task_ids.append(json.loads(message)['headers']['id'])
+            except (ValueError, KeyError, TypeError):
+                continue
+        return task_ids
+
+    def set_worker_limits(self, hostname: str, limits: Dict[str, Any]) -> None:
+        """Publish (or refresh) the resource limits a worker runs under"""
+        limits_key = f'worker:{hostname}:limits'
+        pipe = self.redis.pipeline()
+        pipe.hset(limits_key, mapping=limits)
+        pipe.expire(limits_key, self.worker_limits_expiry)
+        pipe.execute()
+
+    def delete_worker_limits(self, hostname: str) -> None:
+        """Remove the resource limits of a worker that is shutting down"""
+        self.redis.delete(f'worker:{hostname}:limits')
+
+    def get_worker_limits(self, hostname: str) -> Optional[Dict[str, Any]]:
+        """Get the resource limits published by a worker"""
+        limits = self.redis.hgetall(f'worker:{hostname}:limits')
+        return limits if limits else None
+
+    def record_profile_throughput(self, profile: str, task_type: str,
+                                  media_seconds: float, wall_seconds: float) -> None:
+        """Accumulate processed media time against wall-clock time for an encode profile"""
+        stats_key = f'profile:{profile}:{task_type}:stats'
+        pipe = self.redis.pipeline()
+        pipe.sadd('profiles', f'{profile}:{task_type}')
+        pipe.hincrby(stats_key, 'jobs', 1)
+        pipe.hincrbyfloat(stats_key, 'media_seconds', media_seconds)
+        pipe.hincrbyfloat(stats_key, 'wall_seconds', wall_seconds)
+        pipe.execute()
+
+    def get_profile_stats(self) -> Dict[str, Any]:
+        """Get throughput statistics per encode profile and task type"""
+        stats = {}
+        for name in sorted(self.redis.smembers('profiles')):
+            profile, task_type = name.split(':', 1)
+            data = self.redis.hgetall(f'profile:{profile}:{task_type}:stats')
+            jobs = int(data.get('jobs', 0))
+            media_seconds = float(data.get('media_seconds', 0))
+            wall_seconds = float(data.get('wall_seconds', 0))
+            stats.setdefault(profile, {})[task_type] = {
+                'jobs': jobs,
+                'media_seconds': round(media_seconds, 2),
+                'wall_seconds': round(wall_seconds, 2),
+                # Seconds of media processed per second of work, per worker slot
+                'speed': round(media_seconds / wall_seconds, 3) if wall_seconds else None,
+                'jobs_per_hour': round(jobs * 3600 / wall_seconds, 2) if wall_seconds else None,
+            }
+        return stats
+
     def get_task_info(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get detailed task information"""
         task_info = self.redis.hgetall(f'task:{task_id}:info')
-        return task_info if task_info else None
\ No newline at end of file
+        return task_info if task_info else None
+
+    def create_upload(self, upload_id: str, filename: str, size: int, path: str) -> None:
+        """Register a new resumable upload"""
+        upload_key = f'upload:{upload_id}:info'
+        self.redis.hset(upload_key, mapping={
+            'status': 'uploading',
+            'filename': filename,
+            'size': size,
+            'path': path,
+            'created_at': time.time(),
+            'updated_at': time.time()
+        })
+        self.redis.expire(upload_key, self.upload_expiry)
+
+    def get_upload_info(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """Get upload information"""
+        upload_info = self.redis.hgetall(f'upload:{upload_id}:info')
+        return upload_info if upload_info else None
+
+    def begin_upload_chunk(self, upload_id: str, token: str) -> bool:
+        """Register an in-flight chunk writer. Returns False if the upload no longer accepts chunks."""
+        return bool(self._begin_upload_chunk(
+            keys=[f'upload:{upload_id}:info', f'upload:{upload_id}:writers'],
+            args=[token, time.time(), self.upload_expiry]
+        ))
+
+    def end_upload_chunk(self, upload_id: str, token: str,
+                         offset: Optional[int] = None, length: Optional[int] = None) -> bool:
+        """
+        Unregister a chunk writer, recording its chunk if a length is given.
+        Returns True only if the chunk was recorded while the upload was still accepting chunks.
+        """
+        return bool(self._end_upload_chunk(
+            keys=[f'upload:{upload_id}:info', f'upload:{upload_id}:chunks', f'upload:{upload_id}:writers'],
+            args=[token, offset or 0, length or '', time.time(), self.upload_expiry]
+        ))
+
+    def get_upload_ranges(self, upload_id: str) -> List[Tuple[int, int]]:
+        """Get received byte ranges as merged (start, end) pairs"""
+        chunks = sorted(
+            (int(offset), int(offset) + int(length))
+            for offset, length in self.redis.hgetall(f'upload:{upload_id}:chunks').items()
+        )
+        ranges: List[Tuple[int, int]] = []
+        for start, end in chunks:
+            if ranges and start <= ranges[-1][1]:
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+            else:
+                ranges.append((start, end))
+        return ranges
+
+    def begin_upload_finalize(self, upload_id: str) -> str:
+        """
+        Move an upload from 'uploading' to 'finalizing' once no chunk writers are in flight.
+        Returns 'ok', 'missing', 'writing' or the upload's current status.
+        """
+        return self._begin_upload_finalize(
+            keys=[f'upload:{upload_id}:info', f'upload:{upload_id}:writers'],
+            args=[time.time() - self.upload_writer_timeout, time.time()]
+        )
+
+    def transition_upload(self, upload_id: str, from_status: str, to_status: str,
+                          path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Change an upload's status only if it is still from_status, optionally moving it to a new path.
+        Returns the updated upload info, or None if the upload is gone or in another state.
+        """
+        upload_info = self._transition_upload(
+            keys=[f'upload:{upload_id}:info'],
+            args=[from_status, to_status, time.time(), path or '']
+        )
+        if not upload_info:
+            return None
+        return dict(zip(upload_info[::2], upload_info[1::2]))
+
+    def claim_upload(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim a completed upload for processing.
+        Returns the upload info, or None if the upload is unknown, incomplete or already claimed.
+        """
+        upload_info = self.transition_upload(upload_id, 'completed', 'claimed')
+        if upload_info:
+            self.delete_upload(upload_id)
+        return upload_info
+
+    def delete_upload(self, upload_id: str) -> None:
+        """Remove all upload records"""
+        self.redis.delete(
+            f'upload:{upload_id}:info', f'upload:{upload_id}:chunks', f'upload:{upload_id}:writers'
+        )
@@ -0,0 +1,62 @@
+from pathlib import Path
+from types import SimpleNamespace
+import fakeredis
+import pytest
+from redis import Redis
+
+# Route every RedisManager, including those the routes create at import time,
+# to one in-memory server. fakeredis needs lupa to run the upload Lua scripts.
+_server = fakeredis.FakeServer()
+Redis.from_url = classmethod(lambda cls, url, **kwargs: fakeredis.FakeRedis(server=_server, **kwargs))
+
+from app import create_app
+from app.utils.redis_utils import RedisManager
+
+
+@pytest.fixture(autouse=True, scope='session')
+def work_dir():
+    """The API saves inputs here; the Docker image creates it"""
+    Path('/tmp/ffmpeg_api').mkdir(parents=True, exist_ok=True)
+
+
+@pytest.fixture(autouse=True)
+def fake_redis():
+    """Empty in-memory Redis for each test"""
+    client = fakeredis.FakeRedis(server=_server, decode_responses=True)
+    client.flushall()
+    yield client
+    client.flushall()
+
+
+@pytest.fixture
+def redis_manager():
+    return RedisManager()
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config['TESTING'] = True
+    return app.test_client()
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    """Keep resumable upload files in the test's own directory"""
+    from app.routes import uploads
+    monkeypatch.setattr(uploads, 'UPLOAD_DIR', tmp_path / 'uploads')
+    return tmp_path / 'uploads'
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    """Capture queued FFmpeg tasks instead of sending them to a broker"""
+    from app.core.processor import process_ffmpeg
+    calls = []
+
+    def apply_async(args, kwargs, task_id):
+        calls.append({'args': args, 'kwargs': kwargs, 'task_id': task_id})
+        return SimpleNamespace(id=task_id)
+
+    monkeypatch.setattr(process_ffmpeg, 'apply_async', apply_async)
+    return calls
@@ -0,0 +1,177 @@
+import io
+from pathlib import Path
+import pytest
+
+from app.routes.uploads import get_missing_ranges
+from app.utils.file_manager import FileManager
+
+VALID_ASS = b"[Script Info]\nScriptType: v4.00+\n"
+
+
+def create_upload(client, data: bytes, filename: str = 'movie.mp4') -> str:
+    response = client.post('/api/uploads', json={'filename': filename, 'size': len(data)})
+    assert response.status_code == 201
+    return response.get_json()['upload_id']
+
+
+def put_chunk(client, upload_id: str, offset: int, data: bytes):
+    return client.put(f'/api/uploads/{upload_id}?offset={offset}', data=data)
+
+
+def completed_upload(client, data: bytes, filename: str = 'movie.mp4') -> str:
+    upload_id = create_upload(client, data, filename)
+    assert put_chunk(client, upload_id, 0, data).status_code == 200
+    assert client.post(f'/api/uploads/{upload_id}/complete').status_code == 200
+    return upload_id
+
+
+@pytest.fixture
+def cleanup_inputs(enqueued):
+    yield
+    for call in enqueued:
+        FileManager().cleanup_input_files(call['args'][1])
+
+
+def test_get_missing_ranges():
+    assert get_missing_ranges([], 10) == [[0, 10]]
+    assert get_missing_ranges([(0, 4), (6, 10)], 10) == [[4, 6]]
+    assert get_missing_ranges([(2, 5)], 8) == [[0, 2], [5, 8]]
+    assert get_missing_ranges([(0, 10)], 10) == []
+
+
+def test_get_upload_ranges_merges_chunks(redis_manager):
+    redis_manager.create_upload('u1', 'movie.mp4', 20, '/tmp/u1.part')
+    for offset, length in ((10, 5), (0, 4), (4, 3), (12, 6)):
+        token = f'chunk-{offset}'
+        assert redis_manager.begin_upload_chunk('u1', token)
+        assert redis_manager.end_upload_chunk('u1', token, offset, length)
+    assert redis_manager.get_upload_ranges('u1') == [(0, 7), (10, 18)]
+
+
+def test_upload_round_trip(client, upload_dir):
+    data = b'0123456789'
+    upload_id = create_upload(client, data)
+
+    # Chunks may arrive out of order
+    assert put_chunk(client, upload_id, 5, data[5:]).get_json()['missing_ranges'] == [[0, 5]]
+    assert put_chunk(client, upload_id, 0, data[:5]).get_json()['missing_ranges'] == []
+
+    status = client.post(f'/api/uploads/{upload_id}/complete').get_json()
+    assert status['status'] == 'completed'
+    assert (upload_dir / f'{upload_id}_movie.mp4').read_bytes() == data
+
+    # Completing again is idempotent
+    assert client.post(f'/api/uploads/{upload_id}/complete').status_code == 200
+
+
+def test_create_upload_over_limit(client, upload_dir, monkeypatch):
+    from app.routes import uploads
+    monkeypatch.setattr(uploads, 'MAX_UPLOAD_SIZE', 100)
+    response = client.post('/api/uploads', json={'filename': 'movie.mp4', 'size': 101})
+    assert response.status_code == 413
+
+
+def test_complete_incomplete_upload_keeps_accepting_chunks(client, upload_dir):
+    upload_id = create_upload(client, b'0123456789')
+    put_chunk(client, upload_id, 0, b'01234')
+
+    response = client.post(f'/api/uploads/{upload_id}/complete')
+    assert response.status_code == 409
+    assert response.get_json()['details']['missing_ranges'] == [[5, 10]]
+
+    assert put_chunk(client, upload_id, 5, b'56789').status_code == 200
+    assert client.post(f'/api/uploads/{upload_id}/complete').status_code == 200
+
+
+def test_complete_waits_for_in_flight_chunk(client, upload_dir, redis_manager):
+    upload_id = create_upload(client, b'0123')
+    put_chunk(client, upload_id, 0, b'0123')
+
+    # A writer that has registered but not yet finished its chunk
+    assert redis_manager.begin_upload_chunk(upload_id, 'writer')
+    response = client.post(f'/api/uploads/{upload_id}/complete')
+    assert response.status_code == 409
+    assert response.get_json()['error'] == 'Chunks are still being written'
+
+    assert redis_manager.end_upload_chunk(upload_id, 'writer', 0, 4)
+    assert client.post(f'/api/uploads/{upload_id}/complete').status_code == 200
+
+
+def test_stale_writer_does_not_block_complete(client, upload_dir, redis_manager, fake_redis):
+    upload_id = create_upload(client, b'0123')
+    put_chunk(client, upload_id, 0, b'0123')
+
+    # A writer whose request died without unregistering
+    fake_redis.zadd(f'upload:{upload_id}:writers', {'dead-writer': 0})
+    assert client.post(f'/api/uploads/{upload_id}/complete').status_code == 200
+
+
+def test_chunk_after_complete_is_rejected(client, upload_dir, redis_manager):
+    upload_id = completed_upload(client, b'0123')
+    assert put_chunk(client, upload_id, 0, b'0123').status_code == 409
+    # A writer that passed its status check before complete cannot register late
+    assert not redis_manager.begin_upload_chunk(upload_id, 'late-writer')
+
+
+def test_chunk_after_delete_does_not_recreate_upload(client, upload_dir, redis_manager, fake_redis):
+    upload_id = create_upload(client, b'0123')
+    assert redis_manager.begin_upload_chunk(upload_id, 'writer')
+    assert client.delete(f'/api/uploads/{upload_id}').status_code == 204
+
+    assert not redis_manager.end_upload_chunk(upload_id, 'writer', 0, 4)
+    assert fake_redis.keys(f'upload:{upload_id}:*') == []
+    assert client.get(f'/api/uploads/{upload_id}').status_code == 404
+
+
+def test_upload_can_only_be_claimed_once(client, upload_dir, redis_manager):
+    upload_id = completed_upload(client, b'0123')
+    assert redis_manager.claim_upload(upload_id)['status'] == 'claimed'
+    assert redis_manager.claim_upload(upload_id) is None
+
+
+def test_normalize_with_upload(client, upload_dir, enqueued, cleanup_inputs):
+    upload_id = completed_upload(client, b'audio', 'song.mp3')
+    form = {'input_file': upload_id, 'callback_url': 'http://example.com/hook'}
+
+    response = client.post('/api/normalize', data=form)
+    assert response.status_code == 202
+    input_path = Path(enqueued[0]['args'][1][0])
+    assert input_path.read_bytes() == b'audio'
+
+    # The upload was consumed by the first request
+    assert client.post('/api/normalize', data=form).status_code == 400
+    assert len(enqueued) == 1
+
+
+def test_normalize_with_missing_upload_file(client, upload_dir, enqueued):
+    upload_id = completed_upload(client, b'audio', 'song.mp3')
+    (upload_dir / f'{upload_id}_song.mp3').unlink()
+
+    response = client.post('/api/normalize', data={'input_file': upload_id, 'callback_url': 'http://example.com/hook'})
+    assert response.status_code == 400
+    assert enqueued == []
+
+
+def test_captionize_bad_subtitle_keeps_video_upload(client, upload_dir, redis_manager, enqueued):
+    upload_id = completed_upload(client, b'video')
+    response = client.post('/api/captionize', data={
+        'input_video_file': upload_id,
+        'input_ass_file': (io.BytesIO(b'[Events]\n'), 'subs.ass'),
+        'callback_url': 'http://example.com/hook'
+    })
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid ASS subtitle file'
+    assert redis_manager.get_upload_info(upload_id)['status'] == 'completed'
+    assert enqueued == []
+
+
+def test_captionize_with_upload(client, upload_dir, redis_manager, enqueued, cleanup_inputs):
+    upload_id = completed_upload(client, b'video')
+    response = client.post('/api/captionize', data={
+        'input_video_file': upload_id,
+        'input_ass_file': (io.BytesIO(VALID_ASS), 'subs.ass'),
+        'callback_url': 'http://example.com/hook'
+    })
+    assert response.status_code == 202
+    assert redis_manager.get_upload_info(upload_id) is None
+    assert redis_manager.get_backlog_entries().keys() == {enqueued[0]['task_id']}
@@ -0,0 +1,150 @@
+import json
+import pytest
+
+from app.core.autoscaler import AutoscalerConfig, WorkerAutoscaler
+
+
+class FakePool:
+    """Worker pools described by hand, recording resize commands"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.resizes = []
+
+    def get_workers(self):
+        return {hostname: dict(worker) for hostname, worker in self.workers.items()}
+
+    def grow(self, hostname, n):
+        self.resizes.append(('grow', hostname, n))
+        self.workers[hostname]['size'] += n
+
+    def shrink(self, hostname, n):
+        self.resizes.append(('shrink', hostname, n))
+        self.workers[hostname]['size'] -= n
+
+
+@pytest.fixture
+def config():
+    return AutoscalerConfig(
+        min_workers=1, max_workers=8, target_units_per_worker=100,
+        scale_up_after=2, scale_down_after=3, cooldown=60, step=2, backlog_grace=300
+    )
+
+
+@pytest.fixture
+def clock():
+    return [1000.0]
+
+
+def make_autoscaler(workers, config, redis_manager, clock):
+    pool = FakePool(workers)
+    return pool, WorkerAutoscaler(pool, config, redis_manager, clock=lambda: clock[0])
+
+
+def queue_tasks(redis_manager, count, units=100, queued_at=1000.0):
+    for i in range(count):
+        task_id = f'task-{i}'
+        redis_manager.add_backlog(task_id, units, queued_at=queued_at)
+        redis_manager.redis.rpush('celery', json.dumps({'headers': {'id': task_id}}))
+
+
+def test_grow_needs_consecutive_ticks(config, redis_manager, clock):
+    pool, autoscaler = make_autoscaler({'w1': {'size': 1, 'active': 1, 'tasks': []}}, config, redis_manager, clock)
+    queue_tasks(redis_manager, 4)
+
+    assert autoscaler.step() is None
+    assert pool.resizes == []
+    assert autoscaler.step() is not None
+    assert pool.resizes == [('grow', 'w1', 2)]
+
+
+def test_fluctuating_demand_does_not_resize(config, redis_manager, clock):
+    pool, autoscaler = make_autoscaler({'w1': {'size': 2, 'active': 2, 'tasks': []}}, config, redis_manager, clock)
+    for _ in range(4):
+        queue_tasks(redis_manager, 2)
+        autoscaler.step()
+        redis_manager.redis.delete('celery', 'queue:backlog')
+        autoscaler.step()
+    assert pool.resizes == []
+
+
+def test_cooldown_blocks_resize(config, redis_manager, clock):
+    pool, autoscaler = make_autoscaler({'w1': {'size': 1, 'active': 1, 'tasks': []}}, config, redis_manager, clock)
+    queue_tasks(redis_manager, 6)
+    autoscaler.step()
+    autoscaler.step()
+    assert pool.resizes == [('grow', 'w1', 2)]
+
+    clock[0] += 30
+    autoscaler.step()
+    autoscaler.step()
+    assert len(pool.resizes) == 1
+
+    clock[0] += 30
+    autoscaler.step()
+    assert pool.resizes[-1] == ('grow', 'w1', 2)
+
+
+def test_grow_respects_worker_limits(config, redis_manager, clock):
+    redis_manager.set_worker_limits('w1', {'cpus': 2, 'memory_mb': 65536})
+    redis_manager.set_worker_limits('w2', {'cpus': 16, 'memory_mb': 3072})
+    pool, autoscaler = make_autoscaler({
+        'w1': {'size': 1, 'active': 1, 'tasks': []},
+        'w2': {'size': 1, 'active': 1, 'tasks': []},
+    }, config, redis_manager, clock)
+    config.step = 10
+    queue_tasks(redis_manager, 20)
+
+    autoscaler.step()
+    autoscaler.step()
+    assert pool.workers['w1']['size'] == 2
+    assert pool.workers['w2']['size'] == 3
+
+
+def test_shrink_only_removes_idle_processes(config, redis_manager, clock):
+    pool, autoscaler = make_autoscaler({'w1': {'size': 6, 'active': 5, 'tasks': []}}, config, redis_manager, clock)
+    for _ in range(config.scale_down_after):
+        autoscaler.step()
+    assert pool.resizes == [('shrink', 'w1', 1)]
+
+
+def test_shrink_waits_for_busy_workers(config, redis_manager, clock):
+    pool, autoscaler = make_autoscaler({'w1': {'size': 4, 'active': 4, 'tasks': []}}, config, redis_manager, clock)
+    # Desired is the active count, so a busy pool is left alone
+    for _ in range(config.scale_down_after * 2):
+        assert autoscaler.step() is None
+    assert pool.resizes == []
+
+
+def test_shrink_never_goes_below_minimum(config, redis_manager, clock):
+    config.min_workers = 2
+    pool, autoscaler = make_autoscaler({'w1': {'size': 3, 'active': 0, 'tasks': []}}, config, redis_manager, clock)
+    for _ in range(config.scale_down_after):
+        autoscaler.step()
+    assert pool.resizes == [('shrink', 'w1', 1)]
+
+
+def test_stale_backlog_is_pruned_after_grace(config, redis_manager, clock):
+    pool, autoscaler = make_autoscaler(
+        {'w1': {'size': 1, 'active': 1, 'tasks': ['running']}}, config, redis_manager, clock
+    )
+    queue_tasks(redis_manager, 1, queued_at=clock[0])
+    redis_manager.add_backlog('running', 100, queued_at=clock[0])
+    redis_manager.add_backlog('lost', 100, queued_at=clock[0])
+
+    clock[0] += config.backlog_grace - 1
+    assert autoscaler.get_metrics({'running'})['backlog_tasks'] == 1
+    assert set(redis_manager.get_backlog_entries()) == {'task-0', 'running', 'lost'}
+
+    clock[0] += 2
+    autoscaler.get_metrics({'running'})
+    assert set(redis_manager.get_backlog_entries()) == {'task-0', 'running'}
+
+
+def test_worker_limits_expire(redis_manager):
+    redis_manager.set_worker_limits('w1', {'cpus': 4})
+    ttl = redis_manager.redis.ttl('worker:w1:limits')
+    assert 0 < ttl <= redis_manager.worker_limits_expiry
+
+    redis_manager.delete_worker_limits('w1')
+    assert redis_manager.get_worker_limits('w1') is None
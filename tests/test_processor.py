@@ -0,0 +1,115 @@
+import pytest
+
+from app.core import processor as processor_module
+from app.core.encoding import plan_codecs, get_profile_args, ENCODE_PROFILES
+from app.core.processor import FFmpegProcessor
+from app.core.subtitles import _parse_ass, preflight_subtitles, SubtitleValidationError
+
+EVENTS = (
+    "[Events]\n"
+    "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+)
+DIALOGUE = "Dialogue: 0,0:00:01.00,0:00:02.00,Default,,0,0,0,,Hello, world\n"
+MEDIA_INFO = {'duration': 10.0, 'video_codec': 'h264', 'audio_codec': 'aac'}
+
+
+def test_parse_ass_counts_dialogue():
+    info = _parse_ass("[Script Info]\nScriptType: v4.00+\n\n" + EVENTS + DIALOGUE * 2)
+    assert info.dialogue_count == 2
+
+
+def test_parse_ass_allows_bom_and_leading_blank_lines():
+    assert _parse_ass("﻿\n\n[Script Info]\n" + EVENTS + DIALOGUE).dialogue_count == 1
+
+
+@pytest.mark.parametrize('content', [
+    "",
+    "[V4+ Styles]\n[Script Info]\n",
+    "; comment\n[Script Info]\n",
+    "[script info]\n",
+    "  [Script Info]\n",
+])
+def test_parse_ass_requires_script_info_first(content):
+    with pytest.raises(SubtitleValidationError):
+        _parse_ass(content)
+
+
+def test_parse_ass_skips_lines_libass_skips():
+    content = (
+        "[Script Info]\n" + EVENTS
+        + "Dialogue: 0,0:00:01.00,0:00:02.00,Default\n"
+        + "Dialogue: 0,soon,0:00:02.00,Default,,0,0,0,,Bad timestamp\n"
+        + "Dialogue: 0,0:00:01:00,0:00:02.5,Default,,0,0,0,,Loose timestamps\n"
+    )
+    assert _parse_ass(content).dialogue_count == 1
+
+
+def test_parse_ass_uses_declared_event_format():
+    content = "[Script Info]\n[Events]\nFormat: Start, End, Text\nDialogue: 0:00:01.00,0:00:02.00,Hi, there\n"
+    assert _parse_ass(content).dialogue_count == 1
+
+
+def test_preflight_subtitles_accepts_legacy_encodings(tmp_path):
+    subtitle = tmp_path / 'subs.ass'
+    subtitle.write_bytes(("[Script Info]\n" + EVENTS + DIALOGUE.replace('Hello', 'Olá')).encode('latin-1'))
+    assert preflight_subtitles(str(subtitle)).dialogue_count == 1
+
+
+def test_plan_codecs_copies_unfiltered_streams():
+    assert plan_codecs(MEDIA_INFO, 'out.mp4', False, False) == ['-c:v', 'copy', '-c:a', 'copy']
+    assert plan_codecs(None, 'out.mkv', False, False) == ['-c:v', 'copy', '-c:a', 'copy']
+
+
+def test_plan_codecs_encodes_filtered_streams_with_profile():
+    args = plan_codecs(MEDIA_INFO, 'out.webm', True, False, 'fast')
+    assert args == ENCODE_PROFILES['fast']['vp9'] + ['-c:a', 'copy']
+
+
+def test_plan_codecs_skips_missing_streams():
+    media_info = {'duration': 10.0, 'video_codec': None, 'audio_codec': 'mp3'}
+    assert plan_codecs(media_info, 'out.mp3', False, True, 'balanced') == ENCODE_PROFILES['balanced']['mp3']
+    # Without a profile FFmpeg picks its own encoder
+    assert plan_codecs(media_info, 'out.mp3', False, True) == []
+
+
+def test_get_profile_args():
+    assert get_profile_args('archival', 'out.mov', 'audio') == ENCODE_PROFILES['archival']['aac']
+    assert get_profile_args(None, 'out.mp4', 'video') is None
+    with pytest.raises(ValueError):
+        get_profile_args('lossless', 'out.mp4', 'video')
+    # An explicit profile must have an encoder for the container
+    with pytest.raises(ValueError):
+        get_profile_args('fast', 'out.mp3', 'video')
+
+
+def test_get_profile_args_default_falls_back_quietly(monkeypatch):
+    from app.core import encoding
+    monkeypatch.setattr(encoding, 'DEFAULT_ENCODE_PROFILE', 'fast')
+    assert get_profile_args(None, 'out.mp4', 'video') == ENCODE_PROFILES['fast']['h264']
+    assert get_profile_args(None, 'out.flac', 'audio') is None
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    monkeypatch.setattr(processor_module, 'probe_media', lambda path: dict(MEDIA_INFO))
+    return FFmpegProcessor()
+
+
+def test_captionize_command_burns_in_subtitles(processor, tmp_path):
+    subtitle = tmp_path / 'subs.ass'
+    subtitle.write_text("[Script Info]\n" + EVENTS + DIALOGUE)
+    command = processor._get_ffmpeg_command('captionize', ['in.mp4', str(subtitle)], 'out.mp4', profile='fast')
+
+    assert command[command.index('-vf') + 1] == f'subtitles={subtitle}'
+    assert command[command.index('-c:v') + 1] == 'libx264'
+    assert command[command.index('-c:a') + 1] == 'copy'
+    assert not processor.stream_copy_only
+
+
+def test_captionize_command_remuxes_without_dialogue(processor, tmp_path):
+    subtitle = tmp_path / 'subs.ass'
+    subtitle.write_text("[Script Info]\n" + EVENTS)
+    command = processor._get_ffmpeg_command('captionize', ['in.mp4', str(subtitle)], 'out.mp4', profile='fast')
+
+    assert command == ['ffmpeg', '-i', 'in.mp4', '-c:v', 'copy', '-c:a', 'copy', 'out.mp4']
+    assert processor.stream_copy_only